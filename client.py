@@ -0,0 +1,154 @@
+"""Clients for the local batch-evaluation server in server.py.
+
+Client is a blocking client that sends one request at a time.
+AsyncClient pipelines any number of concurrent requests over a single
+connection and matches responses to requests by id.
+
+Example:
+    with Client("/tmp/excelpy.sock") as client:
+        values, errors = client.evaluate("PMT", [
+            {"rate": 0.05/12, "nper": 360, "pv": 100000},
+            {"rate": 0.06/12, "nper": 360, "pv": 100000},
+        ])
+"""
+
+import asyncio
+import itertools
+import socket
+from typing import Any, Self
+from protocol import (
+    HEADER, decode, encode, get_codec, parse_header, read_frame,
+)
+
+
+Results = tuple[list[float | None], list[tuple[int, str]]]
+
+
+def unpack(response: dict[str, Any]) -> Any:
+    if "error" in response:
+        raise ValueError(response["error"])
+    if "metrics" in response:
+        return response["metrics"]
+    return response["values"], [tuple(err) for err in response["errors"]]
+
+
+class Client:
+    def __init__(
+        self,
+        unix: str | None = "/tmp/excelpy.sock",
+        port: int | None = None,
+        codec: str = "json",
+    ) -> None:
+        self.codec = get_codec(codec)
+        if port is not None:
+            self.sock = socket.create_connection(("127.0.0.1", port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix)
+        self.file = self.sock.makefile("rb")
+        self.ids = itertools.count()
+
+    def read(self, size: int) -> bytes:
+        data = self.file.read(size)
+        if len(data) < size:
+            raise ConnectionError("Server closed the connection.")
+        return data
+
+    def request(self, request: dict[str, Any]) -> Any:
+        request = {**request, "id": next(self.ids)}
+        self.sock.sendall(encode(request, self.codec))
+        size, codec = parse_header(self.read(HEADER.size))
+        return unpack(decode(self.read(size), codec))
+
+    def evaluate(self, func: str, calls: list[dict[str, Any]]) -> Results:
+        """Returns one value per call (None where it failed) and a list
+        of (index, message) pairs for the failed calls.
+        """
+        return self.request({"op": "eval", "func": func, "calls": calls})
+
+    def metrics(self) -> dict[str, Any]:
+        return self.request({"op": "metrics"})
+
+    def close(self) -> None:
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+class AsyncClient:
+    def __init__(self, codec: str = "json") -> None:
+        self.codec = get_codec(codec)
+        self.ids = itertools.count()
+        self.waiting: dict[int, asyncio.Future[Any]] = {}
+
+    @classmethod
+    async def connect(
+        cls,
+        unix: str | None = "/tmp/excelpy.sock",
+        port: int | None = None,
+        codec: str = "json",
+    ) -> Self:
+        client = cls(codec)
+        if port is not None:
+            client.reader, client.writer = \
+                await asyncio.open_connection("127.0.0.1", port)
+        else:
+            client.reader, client.writer = \
+                await asyncio.open_unix_connection(unix)
+        client.receiver = asyncio.create_task(client.receive())
+        return client
+
+    async def receive(self) -> None:
+        try:
+            while (frame := await read_frame(self.reader)) is not None:
+                _, response = frame
+                future = self.waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError("Server closed the connection.")
+                    )
+            self.waiting.clear()
+
+    async def request(self, request: dict[str, Any]) -> Any:
+        if self.receiver.done():
+            raise ConnectionError("Server closed the connection.")
+        req_id = next(self.ids)
+        request = {**request, "id": req_id}
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[req_id] = future
+        self.writer.write(encode(request, self.codec))
+        await self.writer.drain()
+        return unpack(await future)
+
+    async def evaluate(
+        self,
+        func: str,
+        calls: list[dict[str, Any]],
+    ) -> Results:
+        return await self.request(
+            {"op": "eval", "func": func, "calls": calls}
+        )
+
+    async def metrics(self) -> dict[str, Any]:
+        return await self.request({"op": "metrics"})
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
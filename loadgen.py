@@ -0,0 +1,112 @@
+"""Load generator for the local batch-evaluation server.
+
+Opens a number of connections, keeps a fixed number of requests in
+flight on each and reports client-side throughput and latency alongside
+the server's own metrics.
+
+Usage:
+    python server.py --unix /tmp/excelpy.sock &
+    python loadgen.py --unix /tmp/excelpy.sock --duration 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+from client import AsyncClient
+from server import percentile
+
+
+def random_call(func: str, rng: random.Random) -> dict[str, Any]:
+    rate = rng.uniform(0.001, 0.02)
+    nper = rng.randint(12, 360)
+    pv = rng.uniform(1e3, 1e6)
+    match func:
+        case "PV":
+            return {"rate": rate, "nper": nper, "pmt": -pv / nper}
+        case "FV":
+            return {"rate": rate, "nper": nper, "pv": -pv}
+        case "PMT":
+            return {"rate": rate, "nper": nper, "pv": pv}
+        case "NPER":
+            return {"rate": rate, "pmt": -pv * rate * 2, "pv": pv}
+        case "RATE":
+            return {"nper": nper, "pmt": -pv * rate * 2, "pv": pv}
+        case "NPV":
+            return {
+                "rate": rate,
+                "values": [-pv] + [pv / 10] * rng.randint(5, 30),
+            }
+    raise ValueError(f"Unknown function {func!r}.")
+
+
+async def worker(
+    client: AsyncClient,
+    args: argparse.Namespace,
+    deadline: float,
+    latencies: list[float],
+    seed: int,
+) -> int:
+    rng = random.Random(seed)
+    calls = 0
+    while time.perf_counter() < deadline:
+        batch = [random_call(args.func, rng) for _ in range(args.calls)]
+        start = time.perf_counter()
+        await client.evaluate(args.func, batch)
+        latencies.append(time.perf_counter() - start)
+        calls += len(batch)
+    return calls
+
+
+async def run(args: argparse.Namespace) -> None:
+    unix = None if args.port is not None else args.unix
+    clients = [
+        await AsyncClient.connect(unix, args.port, args.codec)
+        for _ in range(args.connections)
+    ]
+    latencies: list[float] = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    totals = await asyncio.gather(*(
+        worker(client, args, deadline, latencies, seed)
+        for seed, client in enumerate(
+            clients[i % len(clients)] for i in range(args.concurrency)
+        )
+    ))
+    elapsed = time.perf_counter() - start
+    metrics = await clients[0].metrics()
+    for client in clients:
+        await client.close()
+
+    calls = sum(totals)
+    print(f"requests:     {len(latencies)}")
+    print(f"calls:        {calls}")
+    print(f"requests/s:   {len(latencies) / elapsed:,.0f}")
+    print(f"calls/s:      {calls / elapsed:,.0f}")
+    for q in (0.5, 0.9, 0.99):
+        print(f"latency p{q*100:.0f}:  "
+              f"{percentile(latencies, q) * 1000:.2f} ms")
+    print("server:")
+    for key, val in metrics.items():
+        print(f"  {key}: {val}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    addr = parser.add_mutually_exclusive_group()
+    addr.add_argument("--unix", default="/tmp/excelpy.sock")
+    addr.add_argument("--port", type=int)
+    parser.add_argument("--codec", default="json")
+    parser.add_argument("--func", default="PMT")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="requests kept in flight across connections")
+    parser.add_argument("--calls", type=int, default=16,
+                        help="calls per request")
+    parser.add_argument("--duration", type=float, default=5.0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,75 @@
+"""Wire format shared by server.py and client.py.
+
+Every message is one frame: a 4-byte big-endian payload length, a codec
+byte (b"J" for JSON, b"M" for msgpack) and the encoded payload. The
+server answers each request in the codec it was sent in.
+
+Requests:
+    {"id": 1, "op": "eval", "func": "PV", "calls": [{"rate": 0.05, ...}]}
+    {"id": 2, "op": "metrics"}
+
+Responses carry the request id and either "values" (one per call, None
+where the call failed) with "errors" as [index, message] pairs, a
+"metrics" dict, or a single "error" for a malformed request. A frame
+that cannot be decoded at all is answered with a JSON error frame whose
+id is None, after which the server closes the connection.
+"""
+
+import asyncio
+import json
+import struct
+from typing import Any
+
+try:
+    import msgpack # type: ignore
+except ImportError:
+    msgpack = None
+
+
+HEADER = struct.Struct("!IB")
+JSON = ord("J")
+MSGPACK = ord("M")
+MAX_FRAME = 64 * 2**20
+CODECS = {"json": JSON, "msgpack": MSGPACK}
+
+
+def get_codec(name: str) -> int:
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}.")
+    if CODECS[name] == MSGPACK and msgpack is None:
+        raise ValueError("msgpack codec requires the msgpack package.")
+    return CODECS[name]
+
+
+def encode(obj: Any, codec: int) -> bytes:
+    if codec == MSGPACK:
+        payload = msgpack.packb(obj) # type: ignore
+    else:
+        payload = json.dumps(obj, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload), codec) + payload
+
+
+def decode(payload: bytes, codec: int) -> Any:
+    if codec == MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack codec requires the msgpack package.")
+        return msgpack.unpackb(payload)
+    if codec == JSON:
+        return json.loads(payload)
+    raise ValueError(f"Unknown codec byte {codec!r}.")
+
+
+def parse_header(header: bytes) -> tuple[int, int]:
+    size, codec = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f"Frame of {size} bytes exceeds {MAX_FRAME}.")
+    return size, codec
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, Any] | None:
+    """Reads one frame, returning (codec, message) or None at EOF."""
+    try:
+        size, codec = parse_header(await reader.readexactly(HEADER.size))
+        return codec, decode(await reader.readexactly(size), codec)
+    except asyncio.IncompleteReadError:
+        return None
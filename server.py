@@ -0,0 +1,471 @@
+"""Local batch-evaluation server for the functions in main.
+
+Clients connect over a Unix socket (or localhost TCP) and send batches
+of calls framed as described in protocol.py. Requests arriving within a
+short window are coalesced into one batch per function and evaluated in
+a process pool; each response is written back as soon as its batch is
+done, so responses on one connection may arrive out of order.
+
+Usage:
+    python server.py --unix /tmp/excelpy.sock
+    python server.py --port 8765
+"""
+
+import argparse
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import stat
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+import main
+from protocol import JSON, encode, read_frame
+from util import get_value, number
+
+
+log = logging.getLogger(__name__)
+
+FUNCS = {
+    name: getattr(main, name)
+    for name in ("PV", "FV", "PMT", "NPER", "RATE", "NPV")
+}
+SIGNATURES = {name: inspect.signature(func) for name, func in FUNCS.items()}
+
+
+class InvalidRequest(Exception):
+    """A request that was rejected before being queued."""
+
+
+def is_number(val: Any) -> bool:
+    return isinstance(val, number) and not isinstance(val, bool)
+
+
+def validate_call(name: str, call: Any) -> None:
+    """Checks one call's arguments before it is queued, so that a bad
+    call is rejected on its own rather than inside a shared batch.
+    """
+    if not isinstance(call, dict):
+        raise InvalidRequest(
+            "calls must be a list of keyword argument maps."
+        )
+    try:
+        SIGNATURES[name].bind(**call)
+    except TypeError as e:
+        raise InvalidRequest(f"{name}: {e}")
+    for key, val in call.items():
+        if key == "legacy":
+            if not isinstance(val, bool):
+                raise InvalidRequest("legacy must be a boolean.")
+        elif key == "values":
+            if not isinstance(val, list) or not all(map(is_number, val)):
+                raise InvalidRequest("values must be a list of numbers.")
+        elif not is_number(val):
+            raise InvalidRequest(f"{key} must be a number, not {val!r}.")
+
+
+def claim_socket(path: str) -> None:
+    """Removes a stale socket left at path by a server that has exited.
+
+    Raises FileExistsError if path is not a socket or if a server is
+    still listening on it.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket.")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"A server is already listening on {path}.")
+
+
+def evaluate(
+    name: str,
+    calls: list[dict[str, Any]],
+) -> tuple[list[float | None], list[tuple[int, str]]]:
+    """Runs a batch of calls to one function inside a pool worker."""
+    func = FUNCS[name]
+    values: list[float | None] = []
+    errors: list[tuple[int, str]] = []
+    for i, kwargs in enumerate(calls):
+        try:
+            values.append(get_value(func(**kwargs)))
+        except Exception as e:
+            values.append(None)
+            errors.append((i, f"{e.__class__.__name__}: {e}"))
+    return values, errors
+
+
+def percentile(data: list[float], q: float) -> float:
+    if not data:
+        return 0.0
+    data = sorted(data)
+    return data[min(int(q * len(data)), len(data) - 1)]
+
+
+class Metrics:
+    """Counters and recent samples exposed through the metrics op."""
+
+    def __init__(self, window: int = 10000) -> None:
+        self.requests = 0
+        self.calls = 0
+        self.batches = 0
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.pool_restarts = 0
+        self.batch_sizes: deque[int] = deque(maxlen=window)
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> dict[str, Any]:
+        sizes = list(self.batch_sizes)
+        latencies = list(self.latencies)
+        return {
+            "requests": self.requests,
+            "calls": self.calls,
+            "batches": self.batches,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "pool_restarts": self.pool_restarts,
+            "batch_size_mean": sum(sizes) / len(sizes) if sizes else 0.0,
+            "batch_size_max": max(sizes, default=0),
+            "latency_ms_p50": percentile(latencies, 0.5) * 1000,
+            "latency_ms_p90": percentile(latencies, 0.9) * 1000,
+            "latency_ms_p99": percentile(latencies, 0.99) * 1000,
+        }
+
+
+class Pending:
+    def __init__(self, func: str, calls: list[dict[str, Any]]) -> None:
+        self.func = func
+        self.calls = calls
+        self.future: asyncio.Future[Any] = \
+            asyncio.get_running_loop().create_future()
+
+
+class Batcher:
+    """Coalesces queued requests into batches and runs them in a pool.
+
+    A batch is closed after window seconds or once it holds max_batch
+    calls, whichever comes first. At most max_in_flight batches run at
+    once; further requests wait in the queue. If a worker process dies,
+    the pool is replaced and the batch it was running is retried.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        metrics: Metrics,
+        window: float = 0.002,
+        max_batch: int = 4096,
+        max_in_flight: int = 8,
+    ) -> None:
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers)
+        self.metrics = metrics
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue[Pending] = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(
+        self,
+        func: str,
+        calls: list[dict[str, Any]],
+    ) -> tuple[list[float | None], list[tuple[int, str]]]:
+        item = Pending(func, calls)
+        self.metrics.queue_depth += len(calls)
+        await self.queue.put(item)
+        return await item.future
+
+    async def collect(self) -> list[Pending]:
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        size = len(items[0].calls)
+        deadline = loop.time() + self.window
+        while size < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except TimeoutError:
+                break
+            items.append(item)
+            size += len(item.calls)
+        return items
+
+    async def run(self) -> None:
+        while True:
+            await self.slots.acquire()
+            items = await self.collect()
+            groups: dict[str, list[Pending]] = {}
+            for item in items:
+                groups.setdefault(item.func, []).append(item)
+            self.slots.release()
+            for func, group in groups.items():
+                await self.slots.acquire()
+                task = asyncio.create_task(self.dispatch(func, group))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def dispatch(self, func: str, group: list[Pending]) -> None:
+        calls = [call for item in group for call in item.calls]
+        self.metrics.queue_depth -= len(calls)
+        self.metrics.in_flight += 1
+        self.metrics.batches += 1
+        self.metrics.batch_sizes.append(len(calls))
+        try:
+            try:
+                values, errors = await self.run_batch(func, calls)
+            except BrokenProcessPool:
+                # The worker may have died for reasons unrelated to
+                # this batch, so give it one more go on the new pool.
+                values, errors = await self.run_batch(func, calls)
+        except Exception as e:
+            if len(group) == 1:
+                if not group[0].future.done():
+                    group[0].future.set_exception(e)
+                return
+            # Rerun each request alone so that whatever broke the
+            # batch only fails the request that caused it.
+            for item in group:
+                await self.dispatch_one(func, item)
+            return
+        finally:
+            self.metrics.in_flight -= 1
+            self.slots.release()
+        start = 0
+        for item in group:
+            end = start + len(item.calls)
+            item_errors = [
+                (i - start, msg) for i, msg in errors if start <= i < end
+            ]
+            if not item.future.done():
+                item.future.set_result((values[start:end], item_errors))
+            start = end
+
+    async def run_batch(
+        self,
+        func: str,
+        calls: list[dict[str, Any]],
+    ) -> tuple[list[float | None], list[tuple[int, str]]]:
+        pool = self.pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, evaluate, func, calls
+            )
+        except BrokenProcessPool:
+            self.replace_pool(pool)
+            raise
+
+    def replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        # Every batch that was running on the broken pool fails, but
+        # only the first to notice replaces it.
+        if self.pool is not broken:
+            return
+        log.warning("A worker process died; starting a new pool.")
+        self.metrics.pool_restarts += 1
+        self.pool = ProcessPoolExecutor(self.workers)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def dispatch_one(self, func: str, item: Pending) -> None:
+        try:
+            result = await self.run_batch(func, item.calls)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+
+
+class Server:
+    def __init__(
+        self,
+        workers: int | None = None,
+        window: float = 0.002,
+        max_batch: int = 4096,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.metrics = Metrics()
+        self.batcher = Batcher(
+            self.workers,
+            self.metrics,
+            window=window,
+            max_batch=max_batch,
+            max_in_flight=2 * self.workers,
+        )
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        return self.batcher.pool
+
+    async def respond(
+        self,
+        request: Any,
+        codec: int,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        start = time.perf_counter()
+        req_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            response = await self.handle_request(request)
+        except InvalidRequest as e:
+            response = {"error": f"Invalid request: {e}"}
+        except Exception as e:
+            response = {"error": f"Evaluation failed: {e!r}"}
+        response["id"] = req_id
+        self.metrics.latencies.append(time.perf_counter() - start)
+        try:
+            writer.write(encode(response, codec))
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle_request(self, request: Any) -> dict[str, Any]:
+        if not isinstance(request, dict):
+            raise InvalidRequest("Request must be a map.")
+        op = request.get("op", "eval")
+        if op == "metrics":
+            return {"metrics": self.metrics.snapshot()}
+        if op != "eval":
+            raise InvalidRequest(f"Unknown op {op!r}.")
+        func = request.get("func")
+        calls = request.get("calls")
+        if not isinstance(func, str) or func not in FUNCS:
+            raise InvalidRequest(f"Unknown function {func!r}.")
+        if not isinstance(calls, list):
+            raise InvalidRequest(
+                "calls must be a list of keyword argument maps."
+            )
+        for i, call in enumerate(calls):
+            try:
+                validate_call(func, call)
+            except InvalidRequest as e:
+                raise InvalidRequest(f"call {i}: {e}")
+        self.metrics.requests += 1
+        self.metrics.calls += len(calls)
+        values, errors = await self.batcher.submit(func, calls)
+        return {"values": values, "errors": errors}
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                codec, request = frame
+                task = asyncio.create_task(
+                    self.respond(request, codec, writer)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        except ValueError as e:
+            # The stream can't be resynchronised after a bad frame, so
+            # report it in JSON, which always decodes, and hang up.
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                writer.write(encode(
+                    {"id": None, "error": f"Malformed frame: {e}"}, JSON
+                ))
+                await writer.drain()
+            except ConnectionError:
+                pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(
+        self,
+        unix: str | None = None,
+        port: int | None = None,
+    ) -> asyncio.Server:
+        """Starts listening and batching without blocking."""
+        self.unix = unix
+        if unix is not None:
+            claim_socket(unix)
+            self.server = await asyncio.start_unix_server(
+                self.handle_connection, path=unix
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_connection, host="127.0.0.1", port=port
+            )
+        self.batcher_task = asyncio.create_task(self.batcher.run())
+        self.batcher_task.add_done_callback(self.batcher_done)
+        return self.server
+
+    def batcher_done(self, task: asyncio.Task[None]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.error(
+                "Batcher stopped; requests will not be answered.",
+                exc_info=task.exception(),
+            )
+
+    async def close(self) -> None:
+        self.server.close()
+        self.batcher_task.cancel()
+        self.pool.shutdown(cancel_futures=True)
+        if self.unix is not None:
+            try:
+                if stat.S_ISSOCK(os.lstat(self.unix).st_mode):
+                    os.unlink(self.unix)
+            except FileNotFoundError:
+                pass
+
+    async def serve(
+        self,
+        unix: str | None = None,
+        port: int | None = None,
+    ) -> None:
+        server = await self.start(unix, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    addr = parser.add_mutually_exclusive_group()
+    addr.add_argument("--unix", default="/tmp/excelpy.sock")
+    addr.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig()
+    args = parse_args()
+    server = Server(args.workers, args.window_ms / 1000, args.max_batch)
+    try:
+        asyncio.run(server.serve(
+            None if args.port is not None else args.unix, args.port
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,222 @@
+"""Shared-memory Spans and Tables for multiprocessing workers.
+
+Pickling a Span or Table serializes every Value it holds, which can cost
+more than the work a process pool does with it. Placing the data in a
+SharedBuffer instead leaves workers with a small picklable SharedHandle,
+from which they open read-only Span views over the same memory.
+
+The process that creates a SharedBuffer owns the memory block and must
+unlink it once every worker is done. Workers close their views when they
+are finished with them; Values read from a view are copies and remain
+valid after it is closed.
+
+Example:
+    with SharedBuffer(table) as buf:
+        pool.map(work, [buf.handle] * 8)
+
+    def work(handle: SharedHandle) -> float:
+        with handle.open() as view:
+            return view.table.cols[1].sum().get_value()
+"""
+
+from collections.abc import Sequence
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Iterator, Self
+from currency import Currency
+from percent import Percent
+from span import Span
+from table import Table
+from value import Value
+
+
+# Type codes stored alongside each value so views rebuild the same types.
+INT, FLOAT, CURRENCY, PERCENT = range(4)
+DECODERS = {
+    INT: int,
+    FLOAT: float,
+    CURRENCY: Currency,
+    PERCENT: Percent,
+}
+
+
+def encode(val: Value) -> tuple[float, int]:
+    data = val.data
+    if isinstance(data, Currency):
+        return data.value, CURRENCY
+    if isinstance(data, Percent):
+        return data.value, PERCENT
+    if isinstance(data, int):
+        return float(data), INT
+    return float(data), FLOAT
+
+
+class SharedValues(Sequence[Value]):
+    """Read-only sequence of Values decoded from a shared memory block."""
+
+    def __init__(self, nums: memoryview, codes: memoryview) -> None:
+        self.nums = nums
+        self.codes = codes
+
+    def __len__(self) -> int:
+        return len(self.nums)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Value(DECODERS[self.codes[i]](self.nums[i]))
+
+    def __iter__(self) -> Iterator[Value]:
+        # Raises ValueError up front if the view has been closed.
+        len(self.nums)
+        for num, code in zip(self.nums, self.codes):
+            yield Value(DECODERS[code](num))
+
+    def read_only(self, *_: Any, **__: Any) -> None:
+        raise TypeError(
+            "Shared Span views are read-only; use copy() to modify them."
+        )
+
+    sort = reverse = clear = read_only
+
+    def release(self) -> None:
+        self.nums.release()
+        self.codes.release()
+
+
+class SharedHandle:
+    """Picklable reference to a SharedBuffer, to be sent to workers."""
+
+    def __init__(
+        self,
+        name: str,
+        nrows: int,
+        ncols: int,
+        header: list[str] | None = None,
+    ) -> None:
+        self.name = name
+        self.nrows = nrows
+        self.ncols = ncols
+        self.header = header
+
+    def __repr__(self) -> str:
+        return (
+            f"SharedHandle({self.name!r}, nrows={self.nrows}, "
+            f"ncols={self.ncols}, header={self.header!r})"
+        )
+
+    def open(self) -> "SharedView":
+        """Attaches to the shared memory block without copying it."""
+        return SharedView(self)
+
+
+class SharedView:
+    """Read-only Spans over a shared memory block, opened from a handle.
+
+    The view must be closed (or used as a context manager) before the
+    worker exits. Using its Spans after closing raises ValueError.
+    """
+
+    def __init__(self, handle: SharedHandle) -> None:
+        self.handle = handle
+        # The owner is responsible for unlinking, so workers must not
+        # register the block with their own resource tracker.
+        self.shm = SharedMemory(name=handle.name, track=False)
+        n = handle.nrows * handle.ncols
+        buf = self.shm.buf.toreadonly()
+        nums = buf[:8*n].cast("d")
+        codes = buf[8*n:9*n]
+        buf.release()
+        self.values: list[SharedValues] = []
+        self.cols: list[Span] = []
+        for c in range(handle.ncols):
+            rows = slice(c*handle.nrows, (c+1)*handle.nrows)
+            values = SharedValues(nums[rows], codes[rows])
+            col = Span.__new__(Span)
+            col.values = values # type: ignore
+            self.values.append(values)
+            self.cols.append(col)
+        nums.release()
+        codes.release()
+
+    @property
+    def span(self) -> Span:
+        """The shared Span, for buffers created from a single Span."""
+        if self.handle.header is not None:
+            raise TypeError("Shared buffer holds a Table, not a Span.")
+        return self.cols[0]
+
+    @property
+    def table(self) -> Table:
+        """The shared Table, for buffers created from a Table."""
+        if self.handle.header is None:
+            raise TypeError("Shared buffer holds a Span, not a Table.")
+        return Table(self.cols, self.handle.header)
+
+    def close(self) -> None:
+        for values in self.values:
+            values.release()
+        self.values.clear()
+        self.shm.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+class SharedBuffer:
+    """Owns a shared memory block holding the values of a Span or Table.
+
+    Columns are laid out back to back as float64 values, followed by one
+    type code byte per value. Integers are stored as floats, so values
+    beyond 2**53 lose precision.
+    """
+
+    def __init__(self, data: Span | Table) -> None:
+        if isinstance(data, Table):
+            data.validate_state()
+            cols = data.cols
+            header: list[str] | None = list(data.header)
+        else:
+            cols = [data]
+            header = None
+        nrows = len(cols[0])
+        n = nrows * len(cols)
+        # Zero-sized blocks are not allowed.
+        self.shm = SharedMemory(create=True, size=max(9*n, 1))
+        nums = self.shm.buf[:8*n].cast("d")
+        codes = self.shm.buf[8*n:9*n]
+        try:
+            k = 0
+            for col in cols:
+                for val in col:
+                    nums[k], codes[k] = encode(val)
+                    k += 1
+        except BaseException:
+            nums.release()
+            codes.release()
+            self.close()
+            self.unlink()
+            raise
+        nums.release()
+        codes.release()
+        self.handle = SharedHandle(self.shm.name, nrows, len(cols), header)
+
+    def open(self) -> SharedView:
+        """Opens a view in the owning process, e.g. for checking results."""
+        return self.handle.open()
+
+    def close(self) -> None:
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Frees the block. Views already open stay usable until closed."""
+        self.shm.unlink()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+        self.unlink()
@@ -0,0 +1,285 @@
+"""Excel-style goal seek for the financial functions in main.
+
+goal_seek() finds the value of one keyword argument of PV, FV, PMT,
+NPV, etc. that makes the function return a target, e.g. the pv for
+which PMT hits a given payment. A batch of targets is solved in order,
+each search starting from the previous solution, so neighbouring
+targets converge in a handful of steps. Failures are reported in the
+result rather than raised.
+
+NPV takes its cash flows as one sequence, so only its rate can be
+varied directly; to solve for a single cash flow, wrap it in a function
+of that flow (see goal_seek).
+"""
+
+import inspect
+import math
+from typing import Any, Callable, Iterable
+from currency import Currency
+from percent import Percent
+from util import get_value, number
+from value import Value
+
+
+EPS = 2.0**-52
+
+
+class GoalSeekResult:
+    """Solution and convergence diagnostics for one target."""
+
+    def __init__(
+        self,
+        x: float,
+        converged: bool,
+        iterations: int,
+        evaluations: int,
+        residual: float,
+        message: str = "",
+    ) -> None:
+        self.x = x
+        self.converged = converged
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.residual = residual
+        self.message = message
+
+    def __repr__(self) -> str:
+        return (
+            f"GoalSeekResult(x={self.x!r}, converged={self.converged}, "
+            f"iterations={self.iterations}, "
+            f"evaluations={self.evaluations}, residual={self.residual!r}, "
+            f"message={self.message!r})"
+        )
+
+    def __bool__(self) -> bool:
+        return self.converged
+
+
+class Objective:
+    """func(**kwargs, vary=x) - target, counting evaluations."""
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        vary: str,
+        kwargs: dict[str, Any],
+    ) -> None:
+        self.func = func
+        self.vary = vary
+        self.kwargs = kwargs
+        self.target = 0.0
+        self.evaluations = 0
+
+    def __call__(self, x: float) -> float:
+        self.evaluations += 1
+        try:
+            return get_value(self.func(**self.kwargs, **{self.vary: x})) \
+                - self.target
+        except (ArithmeticError, TypeError, ValueError):
+            # TypeError covers complex intermediates, e.g. a negative
+            # base raised to a fractional nper.
+            return math.nan
+
+
+def approach(
+    f: Objective,
+    good: float,
+    f_good: float,
+    bad: float,
+    tol: float,
+) -> tuple[float, float, float, float]:
+    """Bisects from good towards bad, where f cannot be evaluated.
+
+    Returns (good, f_good, x, fx) with x the first point found where f
+    changes sign, or x == good, the finite point nearest bad, if f keeps
+    its sign until the gap is narrower than tol.
+    """
+    while abs(bad - good) > tol:
+        mid = (good + bad) / 2
+        f_mid = f(mid)
+        if math.isnan(f_mid):
+            bad = mid
+        elif f_good * f_mid <= 0:
+            return good, f_good, mid, f_mid
+        else:
+            good, f_good = mid, f_mid
+    return good, f_good, good, f_good
+
+
+def bracket(
+    f: Objective,
+    x0: float,
+    lo: float,
+    hi: float,
+    tol: float,
+) -> tuple[float, float, float, float] | None:
+    """Expands outwards from x0 until f changes sign within [lo, hi].
+
+    Points where f cannot be evaluated are stepped over. If f cannot be
+    evaluated at a bound, the gap between it and the nearest finite
+    probe is searched by bisection instead.
+    """
+    a = b = up = down = x0
+    fa = fb = f(x0)
+    if fa == 0:
+        return a, fa, b, fb
+    step = (hi - lo) * 1e-3
+    while down > lo or up < hi:
+        if up < hi:
+            up = x = min(x0 + step, hi)
+            fx = f(x)
+            if math.isnan(fx) and x == hi and not math.isnan(fb):
+                b, fb, x, fx = approach(f, b, fb, hi, tol)
+            if not math.isnan(fx):
+                if not math.isnan(fb) and fb * fx <= 0:
+                    return b, fb, x, fx
+                b, fb = x, fx
+        if down > lo:
+            down = x = max(x0 - step, lo)
+            fx = f(x)
+            if math.isnan(fx) and x == lo and not math.isnan(fa):
+                a, fa, x, fx = approach(f, a, fa, lo, tol)
+            if not math.isnan(fx):
+                if not math.isnan(fa) and fa * fx <= 0:
+                    return x, fx, a, fa
+                a, fa = x, fx
+        if not math.isnan(fa) and not math.isnan(fb) and fa * fb <= 0:
+            return a, fa, b, fb
+        step *= 4
+    return None
+
+
+def brent(
+    f: Objective,
+    a: float,
+    fa: float,
+    b: float,
+    fb: float,
+    tol: float,
+    maxiter: int,
+) -> GoalSeekResult:
+    """Brent's method: secant and inverse quadratic steps, falling back
+    to bisection whenever they leave the bracket or converge slowly.
+
+    A bracket that narrows onto a pole rather than a root is reported
+    as a discontinuity instead of a solution.
+    """
+    ftol = math.sqrt(EPS) * max(1.0, abs(f.target))
+    f_start = min(abs(fa), abs(fb))
+    c, fc = b, fb
+    d = e = b - a
+    for it in range(maxiter + 1):
+        if math.isnan(fb):
+            return GoalSeekResult(
+                b, False, it, f.evaluations, fb,
+                f"Function could not be evaluated at {b!r}.",
+            )
+        if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2*EPS*abs(b) + 0.5*tol
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol1 or fb == 0:
+            if abs(fb) <= ftol or abs(fb) < f_start:
+                return GoalSeekResult(b, True, it, f.evaluations, fb)
+            return GoalSeekResult(
+                b, False, it, f.evaluations, fb,
+                "Sign change is a discontinuity, not a root.",
+            )
+        if it == maxiter:
+            break
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Secant step.
+                p = 2 * xm * s
+                q = 1 - s
+            else:
+                # Inverse quadratic interpolation.
+                q = fa / fc
+                r = fb / fc
+                p = s * (2*xm*q*(q - r) - (b - a)*(r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2*p < min(3*xm*q - abs(tol1*q), abs(e*q)):
+                e = d
+                d = p / q
+            else:
+                d = e = xm
+        else:
+            d = e = xm
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else math.copysign(tol1, xm)
+        fb = f(b)
+    return GoalSeekResult(
+        b, False, maxiter, f.evaluations, fb,
+        "Goal seek did not converge.",
+    )
+
+
+def goal_seek(
+    func: Callable[..., Any],
+    target: number | Currency | Percent | Value
+        | Iterable[number | Currency | Percent | Value],
+    vary: str,
+    bounds: tuple[number, number],
+    guess: number | None = None,
+    tol: float = 1e-9,
+    maxiter: int = 100,
+    **kwargs: Any,
+) -> GoalSeekResult | list[GoalSeekResult]:
+    """Solves func(**kwargs, vary=x) == target for x within bounds.
+
+    Example:
+        goal_seek(PMT, Currency(-500), vary="pv", bounds=(0, 1e6),
+                  rate=0.05/12, nper=360)
+
+    vary must name a keyword argument of func. To vary something that
+    is not one, such as a single cash flow passed to NPV, pass a small
+    adapter instead:
+        goal_seek(lambda fv: NPV(0.1, [-1000, 300, 400, fv]), 0,
+                  vary="fv", bounds=(0, 1e4))
+
+    If target is iterable, a list of results is returned, one per target.
+    Each search starts at the previous converged solution (or at guess,
+    or the middle of bounds) and widens until the bracket holds a sign
+    change, then refines it with Brent's method.
+    """
+    if vary in kwargs:
+        raise ValueError(f"{vary!r} cannot be both varied and fixed.")
+    try:
+        inspect.signature(func).bind_partial(**kwargs, **{vary: 0})
+    except TypeError as e:
+        raise ValueError(f"Invalid arguments for {func.__name__}: {e}")
+    lo, hi = map(float, bounds)
+    if not lo < hi:
+        raise ValueError("Lower bound must be less than upper bound.")
+    start = (lo + hi) / 2 if guess is None else float(guess)
+    if not lo <= start <= hi:
+        raise ValueError("guess must lie within bounds.")
+
+    f = Objective(func, vary, kwargs)
+    batch = isinstance(target, Iterable)
+    targets = target if isinstance(target, Iterable) else [target]
+    results = []
+    x0 = start
+    for t in targets:
+        f.target = get_value(t.data if isinstance(t, Value) else t)
+        f.evaluations = 0
+        found = bracket(f, x0, lo, hi, tol)
+        if found is None:
+            res = GoalSeekResult(
+                x0, False, 0, f.evaluations, math.nan,
+                "Target is not reached within bounds.",
+            )
+        else:
+            res = brent(f, *found, tol, maxiter)
+        if res.converged:
+            x0 = res.x
+        results.append(res)
+    return results if batch else results[0]
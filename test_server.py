@@ -0,0 +1,116 @@
+import asyncio
+import os
+import signal
+import socket
+import tempfile
+import unittest
+from client import AsyncClient
+from protocol import HEADER, JSON, decode
+from server import Server
+
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "excelpy.sock")
+        # A long window makes requests sent together share one batch.
+        self.server = Server(workers=1, window=0.2)
+        await self.server.start(self.path)
+        self.a = await AsyncClient.connect(self.path)
+        self.b = await AsyncClient.connect(self.path)
+
+    async def asyncTearDown(self) -> None:
+        await self.a.close()
+        await self.b.close()
+        await self.server.close()
+        self.tmp.cleanup()
+
+    async def test_invalid_request_does_not_fail_others(self) -> None:
+        good = self.a.evaluate("PMT", [{"rate": 0.01, "nper": 12, "pv": 100}])
+        bad = self.b.evaluate("PMT", [{"rate": 0.01, "nper": 12, "pv": None}])
+        good_res, bad_res = await asyncio.gather(
+            good, bad, return_exceptions=True
+        )
+        self.assertIsInstance(bad_res, ValueError)
+        self.assertIn("Invalid request", str(bad_res))
+        values, errors = good_res
+        self.assertAlmostEqual(values[0], -8.88487887)
+        self.assertEqual(errors, [])
+
+    async def test_call_errors_are_sliced_per_request(self) -> None:
+        ok = {"rate": 0.01, "nper": 12, "pv": 100}
+        fails = {"rate": 0.01, "nper": 0, "pv": 100}
+        (a_values, a_errors), (b_values, b_errors) = await asyncio.gather(
+            self.a.evaluate("PMT", [ok, fails]),
+            self.b.evaluate("PMT", [fails, ok, ok]),
+        )
+        self.assertEqual(a_values[1], None)
+        self.assertEqual([i for i, _ in a_errors], [1])
+        self.assertEqual(b_values[0], None)
+        self.assertEqual([i for i, _ in b_errors], [0])
+        self.assertAlmostEqual(b_values[2], a_values[0])
+
+        metrics = await self.a.metrics()
+        self.assertEqual(metrics["batches"], 1)
+        self.assertEqual(metrics["batch_size_max"], 5)
+        self.assertEqual(metrics["queue_depth"], 0)
+
+    async def test_responses_match_request_ids(self) -> None:
+        results = await asyncio.gather(*(
+            self.a.evaluate("FV", [{"rate": 0.1, "nper": 1, "pv": -n}])
+            for n in range(20)
+        ))
+        for n, (values, _) in enumerate(results):
+            self.assertAlmostEqual(values[0], 1.1 * n)
+
+    async def test_malformed_frame_gets_error_reply(self) -> None:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(HEADER.pack(3, JSON) + b"{x}")
+        size, codec = HEADER.unpack(await reader.readexactly(HEADER.size))
+        response = decode(await reader.readexactly(size), codec)
+        self.assertIsNone(response["id"])
+        self.assertIn("Malformed frame", response["error"])
+        self.assertEqual(await reader.read(), b"")
+        writer.close()
+
+    async def test_live_socket_is_not_replaced(self) -> None:
+        server = Server(workers=1)
+        with self.assertRaises(FileExistsError):
+            await server.start(self.path)
+        server.pool.shutdown()
+
+    async def test_dead_worker_is_replaced(self) -> None:
+        call = {"rate": 0.01, "nper": 12, "pv": 100}
+        await self.a.evaluate("PMT", [call])
+        for pid in list(self.server.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        for _ in range(3):
+            values, errors = await self.a.evaluate("PMT", [call])
+            self.assertAlmostEqual(values[0], -8.88487887)
+            self.assertEqual(errors, [])
+        metrics = await self.a.metrics()
+        self.assertEqual(metrics["pool_restarts"], 1)
+
+
+class ClaimSocketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_regular_file_is_not_removed(self) -> None:
+        with tempfile.NamedTemporaryFile() as f:
+            server = Server(workers=1)
+            with self.assertRaises(FileExistsError):
+                await server.start(f.name)
+            server.pool.shutdown()
+            self.assertTrue(os.path.isfile(f.name))
+
+    async def test_stale_socket_is_replaced(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stale.sock")
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(path)
+            stale.close()
+            server = Server(workers=1)
+            await server.start(path)
+            await server.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import unittest
+from multiprocessing import Pool
+from currency import Currency
+from percent import Percent
+from shared import SharedBuffer, SharedHandle
+from span import Span
+from table import Table
+
+
+def column_sum(handle: SharedHandle) -> str:
+    with handle.open() as view:
+        return str(view.table.cols[1].sum())
+
+
+class SharedBufferTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.table = Table(
+            [
+                Span([1, 2, 3]),
+                Span([4, 5, 6]).as_currency(),
+                Span([0.1, 0.2, Percent(0.3)]),
+            ],
+            ["a", "b", "c"],
+        )
+
+    def test_span_round_trip(self) -> None:
+        span = Span([1, 2.5, Currency(3), Percent(0.1)])
+        with SharedBuffer(span) as buf, buf.open() as view:
+            self.assertEqual(
+                [repr(val) for val in view.span],
+                [repr(val) for val in span],
+            )
+
+    def test_table_round_trip(self) -> None:
+        with SharedBuffer(self.table) as buf, buf.open() as view:
+            self.assertEqual(repr(view.table), repr(self.table))
+
+    def test_views_are_read_only(self) -> None:
+        with SharedBuffer(Span([3, 1, 2])) as buf, buf.open() as view:
+            with self.assertRaises(TypeError):
+                view.span.sort()
+            copy = view.span.copy()
+            copy.sort()
+            self.assertEqual(list(copy.iter_number()), [1, 2, 3])
+
+    def test_closed_view_raises(self) -> None:
+        with SharedBuffer(Span([1, 2])) as buf:
+            with buf.open() as view:
+                span = view.span
+            with self.assertRaises(ValueError):
+                span.sum()
+
+    def test_workers(self) -> None:
+        with SharedBuffer(self.table) as buf, Pool(2) as pool:
+            self.assertEqual(
+                pool.map(column_sum, [buf.handle] * 2), ["$15.00"] * 2
+            )
+
+    def test_failed_fill_frees_block(self) -> None:
+        before = set(os.listdir("/dev/shm"))
+        with self.assertRaises(ValueError):
+            SharedBuffer(Span([1, "x"]))
+        self.assertEqual(set(os.listdir("/dev/shm")), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from currency import Currency
+from main import FV, NPV, PMT, PV
+from solver import goal_seek
+
+
+class GoalSeekTest(unittest.TestCase):
+    def test_solves_pv_for_target_pmt(self) -> None:
+        res = goal_seek(PMT, Currency(-500), vary="pv", bounds=(0, 1e6),
+                        rate=0.05/12, nper=360)
+        self.assertTrue(res.converged)
+        self.assertAlmostEqual(PMT(0.05/12, 360, pv=res.x).value, -500)
+
+    def test_batch_matches_forward_function(self) -> None:
+        targets = [-400, -410, -420, -430]
+        results = goal_seek(PMT, targets, vary="pv", bounds=(0, 1e6),
+                            rate=0.05/12, nper=360)
+        for target, res in zip(targets, results):
+            self.assertTrue(res.converged)
+            self.assertAlmostEqual(PMT(0.05/12, 360, pv=res.x).value, target)
+
+    def test_npv_rate_and_adapter(self) -> None:
+        res = goal_seek(NPV, 0, vary="rate", bounds=(-0.5, 1),
+                        values=[-100, 30, 40, 50])
+        self.assertAlmostEqual(res.x, 0.0889634, places=6)
+        res = goal_seek(lambda fv: NPV(0.1, [-1000, 300, 400, fv]), 0,
+                        vary="fv", bounds=(0, 1e4))
+        self.assertAlmostEqual(res.x, 528)
+
+    def test_fv_zeroed_by_pv(self) -> None:
+        res = goal_seek(FV, 0, vary="pv", bounds=(-1e6, 1e6),
+                        rate=0.03, nper=10, pmt=100)
+        self.assertAlmostEqual(res.x, PV(0.03, 10, pmt=100).value)
+
+    def test_lower_bound_of_zero(self) -> None:
+        # PV and PMT cannot be evaluated at rate 0 or nper 0, so the
+        # search must close in on the bound rather than skip past it.
+        res = goal_seek(PV, -1000, vary="rate", bounds=(0, 0.5),
+                        nper=10, pmt=120)
+        self.assertTrue(res.converged, res.message)
+        self.assertAlmostEqual(res.x, 0.0346, places=4)
+        res = goal_seek(PMT, -10000, vary="nper", bounds=(0, 600),
+                        rate=0.05/12, pv=100000)
+        self.assertTrue(res.converged, res.message)
+        self.assertAlmostEqual(res.x, 10.24, places=2)
+
+    def test_failures_are_reported(self) -> None:
+        res = goal_seek(PV, 1000, vary="nper", bounds=(1, 100),
+                        rate=-1.5, fv=-2000)
+        self.assertFalse(res.converged)
+        res = goal_seek(PV, 0, vary="rate", bounds=(-2, 1), nper=3, fv=100)
+        self.assertFalse(res.converged)
+        self.assertIn("discontinuity", res.message)
+        res = goal_seek(PV, -1e9, vary="rate", bounds=(0.01, 1),
+                        nper=10, pmt=100)
+        self.assertFalse(res.converged)
+        self.assertIn("not reached", res.message)
+
+    def test_invalid_arguments_raise(self) -> None:
+        with self.assertRaises(ValueError):
+            goal_seek(PV, 0, vary="foo", bounds=(0, 1), nper=1)
+        with self.assertRaises(ValueError):
+            goal_seek(PV, 0, vary="rate", bounds=(1, 0), nper=1)
+
+
+if __name__ == "__main__":
+    unittest.main()